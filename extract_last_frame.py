@@ -1,76 +1,284 @@
 """
 视频最后一帧提取器
 
-使用 OpenCV 从视频文件中提取最后一帧并保存为图片。
+优先使用 PyAV 定位到最后一个关键帧解码，失败时回退到 OpenCV，
+从视频文件中提取最后一帧并保存为图片。
 支持中文路径。
 
 使用方法：
-    python extract_last_frame.py <视频文件路径> [输出图片路径]
+    python extract_last_frame.py <视频文件路径> [输出图片路径] [--format jpg|png|webp]
+    python extract_last_frame.py <视频文件路径或通配符> ... [--format jpg|png|webp]
+    <输出视频路径的命令> | python extract_last_frame.py --serve
 
 示例：
     python extract_last_frame.py video.mp4
     python extract_last_frame.py video.mp4 last_frame.png
+    python extract_last_frame.py video.mp4 --format png
+    python extract_last_frame.py a.mp4 b.mkv "videos/*.mp4"
+    find . -name '*.mp4' | python extract_last_frame.py --serve
 """
 
-import sys
+import argparse
+import glob
+import mmap
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable
 
 import cv2
-import numpy as np
 
+if TYPE_CHECKING:
+    # numpy 只用于类型注解，运行时不导入以缩短启动时间
+    import numpy as np
+
+try:
+    import av
+except ImportError:
+    # PyAV 为可选依赖，未安装时只使用 OpenCV
+    av = None
+
+# Windows 短路径名 API，只在模块加载时获取一次并设置参数类型
+_GetShortPathNameW = None
+if sys.platform == 'win32':
+    try:
+        import ctypes
+        from ctypes import wintypes
+        
+        _GetShortPathNameW = ctypes.windll.kernel32.GetShortPathNameW
+        _GetShortPathNameW.argtypes = [wintypes.LPCWSTR, wintypes.LPWSTR, wintypes.DWORD]
+        _GetShortPathNameW.restype = wintypes.DWORD
+    except Exception:
+        _GetShortPathNameW = None
 
-def open_video_chinese_path(video_path: str) -> cv2.VideoCapture:
+
+# 按帧号定位失败时依次向前退避的偏移量，最近的可用定位点通常在一个 GOP 之内
+SEEK_BACKOFF_OFFSETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# 各输出格式的编码参数
+# NOTE: JPEG 质量 95 编码速度远快于 PNG；PNG 使用最低压缩级别以减少 zlib 开销
+IMAGE_ENCODE_PARAMS = {
+    '.jpg': [cv2.IMWRITE_JPEG_QUALITY, 95, cv2.IMWRITE_JPEG_OPTIMIZE, 0],
+    '.jpeg': [cv2.IMWRITE_JPEG_QUALITY, 95, cv2.IMWRITE_JPEG_OPTIMIZE, 0],
+    '.png': [cv2.IMWRITE_PNG_COMPRESSION, 1],
+    '.webp': [cv2.IMWRITE_WEBP_QUALITY, 95],
+}
+
+# 视频旋转元数据（顺时针角度）对应的旋转方式，与 OpenCV 自动旋转的处理一致
+ORIENTATION_ROTATE_CODES = {
+    90: cv2.ROTATE_90_CLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+}
+
+# 命令行第二个参数是这些扩展名时，即使文件已存在也视为输出图片路径（覆盖）
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff')
+
+# 批量处理时的最大线程数（OpenCV/FFmpeg 解码和编码时会释放 GIL）
+MAX_BATCH_WORKERS = 8
+
+
+def _configure_capture(cap: cv2.VideoCapture) -> None:
     """
-    打开视频文件，支持中文路径
+    设置已打开的 VideoCapture 的读取参数
     
-    NOTE: OpenCV 的 VideoCapture 不支持中文路径，
-    这里使用文件句柄方式绕过这个限制
+    NOTE: 只提取单帧，不需要 FFmpeg 后端默认的多帧解码缓冲；
+    关闭逐帧自动旋转，改为只对最终保留的帧旋转一次。不支持这些属性的后端会忽略设置
     
     Args:
-        video_path: 视频文件路径
+        cap: 已打开的 VideoCapture 对象
+    """
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    if hasattr(cv2, 'CAP_PROP_ORIENTATION_AUTO'):
+        cap.set(cv2.CAP_PROP_ORIENTATION_AUTO, 0)
+
+
+def _rotate_frame(frame: "np.ndarray", angle: int) -> "np.ndarray":
+    """
+    按顺时针角度旋转帧
+    
+    Args:
+        frame: 需要旋转的帧
+        angle: 顺时针旋转角度（0/90/180/270）
+        
+    Returns:
+        旋转后的帧；角度为 0 或不是 90 的倍数时原样返回
+    """
+    rotate_code = ORIENTATION_ROTATE_CODES.get(angle % 360)
+    if rotate_code is None:
+        return frame
+    return cv2.rotate(frame, rotate_code)
+
+
+def _apply_orientation(cap: cv2.VideoCapture, frame: "np.ndarray") -> "np.ndarray":
+    """
+    按视频的旋转元数据旋转最终保留的帧（例如手机拍摄的竖屏视频）
+    
+    Args:
+        cap: 已打开的 VideoCapture 对象
+        frame: 读取到的帧
+        
+    Returns:
+        旋转后的帧；没有旋转元数据或后端已自动旋转时原样返回
+    """
+    if not hasattr(cv2, 'CAP_PROP_ORIENTATION_META'):
+        return frame
+    
+    # 后端不支持关闭自动旋转时，帧已经旋转过了
+    if cap.get(cv2.CAP_PROP_ORIENTATION_AUTO):
+        return frame
+    
+    return _rotate_frame(frame, int(cap.get(cv2.CAP_PROP_ORIENTATION_META)))
+
+
+def _ffmpeg_open_params(hwaccel: bool = False) -> list[int]:
+    """
+    构造使用 CAP_FFMPEG 打开视频时的参数
+    
+    NOTE: 解码线程数只能在打开时通过参数设置，打开后再 set 无效；
+    这里使用全部 CPU 核心解码，追求吞吐而不是低延迟
+    
+    Args:
+        hwaccel: 是否请求硬件加速解码
+        
+    Returns:
+        VideoCapture 打开参数列表，当前 OpenCV 版本不支持这些属性时为空
+    """
+    params = []
+    if hasattr(cv2, 'CAP_PROP_N_THREADS'):
+        params += [cv2.CAP_PROP_N_THREADS, os.cpu_count() or 4]
+    if hwaccel and hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+        params += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+    return params
+
+
+def _open_capture(path: str, hwaccel: bool = False) -> cv2.VideoCapture:
+    """
+    打开视频文件，可选启用硬件加速解码
+    
+    NOTE: 硬件加速需要 OpenCV 4.5.2+ 以及可用的驱动（VAAPI/DXVA2/CUDA 等），
+    不可用时回退到普通的软件解码。打开顺序只在这里定义，每种方式最多尝试一次：
+    硬件加速 → 带参数的 FFmpeg 后端 → 默认后端 → 不带参数的 FFmpeg 后端（不支持参数时）
+    
+    Args:
+        path: 视频文件路径
+        hwaccel: 是否尝试硬件加速解码
         
     Returns:
         VideoCapture 对象
     """
-    # 尝试直接打开（对于纯英文路径更高效）
-    cap = cv2.VideoCapture(video_path)
-    if cap.isOpened():
-        return cap
+    if hwaccel and hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+        cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, _ffmpeg_open_params(hwaccel=True))
+        if cap.isOpened():
+            _configure_capture(cap)
+            return cap
     
-    # 如果直接打开失败，尝试使用 cv2.CAP_FFMPEG 后端
-    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+    # 带解码线程数参数通过 FFmpeg 后端打开
+    params = _ffmpeg_open_params()
+    if params:
+        cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, params)
+        if cap.isOpened():
+            _configure_capture(cap)
+            return cap
+    
+    cap = cv2.VideoCapture(path)
     if cap.isOpened():
+        _configure_capture(cap)
         return cap
     
-    # 使用短路径名来处理中文路径（Windows 特有方案）
-    try:
-        import ctypes
-        from ctypes import wintypes
-        
-        # 获取短路径名
-        GetShortPathNameW = ctypes.windll.kernel32.GetShortPathNameW
-        GetShortPathNameW.argtypes = [wintypes.LPCWSTR, wintypes.LPWSTR, wintypes.DWORD]
-        GetShortPathNameW.restype = wintypes.DWORD
+    # 默认后端打开失败，且上面没有尝试过 FFmpeg 后端时，再尝试一次
+    if not params:
+        cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG)
+        if cap.isOpened():
+            _configure_capture(cap)
+    
+    return cap
+
+
+def _open_via_short_path(video_path: str, hwaccel: bool = False) -> cv2.VideoCapture | None:
+    """
+    通过 Windows 短路径名（8.3 格式）打开视频，绕过 OpenCV 不支持中文路径的限制
+    
+    Args:
+        video_path: 视频文件路径
+        hwaccel: 是否尝试硬件加速解码
         
+    Returns:
+        已打开的 VideoCapture 对象，无法获取短路径或打开失败时返回 None
+    """
+    if _GetShortPathNameW is None:
+        return None
+    
+    try:
         # 获取需要的缓冲区大小
-        buffer_size = GetShortPathNameW(video_path, None, 0)
+        buffer_size = _GetShortPathNameW(video_path, None, 0)
         if buffer_size > 0:
             output_buffer = ctypes.create_unicode_buffer(buffer_size)
-            GetShortPathNameW(video_path, output_buffer, buffer_size)
+            _GetShortPathNameW(video_path, output_buffer, buffer_size)
             short_path = output_buffer.value
             
-            cap = cv2.VideoCapture(short_path)
+            cap = _open_capture(short_path, hwaccel)
             if cap.isOpened():
                 return cap
     except Exception:
         pass
     
-    # 返回未打开的 cap 对象，让调用者处理错误
-    return cap
+    return None
+
+
+def open_video_chinese_path(video_path: str, hwaccel: bool = False) -> cv2.VideoCapture:
+    """
+    打开视频文件，支持中文路径
+    
+    NOTE: OpenCV 的 VideoCapture 不支持中文路径，
+    这里使用文件句柄方式绕过这个限制
+    
+    Args:
+        video_path: 视频文件路径
+        hwaccel: 是否尝试硬件加速解码
+        
+    Returns:
+        VideoCapture 对象
+    """
+    # Windows 下的非 ASCII 路径优先使用短路径名（Windows 特有方案），
+    # 避免 FFmpeg 先逐个尝试解复用器失败造成的卡顿
+    if sys.platform == 'win32' and not video_path.isascii():
+        cap = _open_via_short_path(video_path, hwaccel)
+        if cap is not None:
+            return cap
+    
+    # 直接打开；失败时返回未打开的 cap 对象，让调用者处理错误
+    return _open_capture(video_path, hwaccel)
 
 
-def save_image_chinese_path(image: np.ndarray, output_path: str) -> bool:
+def _write_encoded(encoded: "np.ndarray", output_path: str) -> None:
+    """
+    把 imencode 的结果直接写入文件
+    
+    NOTE: 通过 memoryview 直接写 ndarray 的缓冲区，避免 tobytes() 再复制一份；
+    Windows 下必须加 O_BINARY，否则换行符会被转换导致图片损坏
+    
+    Args:
+        encoded: cv2.imencode 返回的编码数据
+        output_path: 输出路径
+    """
+    if encoded.data.contiguous:
+        view = memoryview(encoded).cast('B')
+    else:
+        view = memoryview(encoded.tobytes())
+    
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    fd = os.open(output_path, flags, 0o644)
+    try:
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
+
+
+def save_image_chinese_path(image: "np.ndarray", output_path: str) -> bool:
     """
     保存图片，支持中文路径
     
@@ -84,56 +292,237 @@ def save_image_chinese_path(image: np.ndarray, output_path: str) -> bool:
     Returns:
         是否保存成功
     """
-    # 尝试直接保存（对于纯英文路径更高效）
-    try:
-        success = cv2.imwrite(output_path, image)
-        if success:
-            return True
-    except Exception:
-        pass
+    # 根据文件扩展名确定编码格式
+    ext = Path(output_path).suffix.lower()
+    if not ext:
+        ext = '.jpg'
+    params = IMAGE_ENCODE_PARAMS.get(ext, [])
+    
+    # 纯英文路径尝试直接保存；非 ASCII 路径跳过 imwrite，避免失败后重复编码
+    if output_path.isascii():
+        try:
+            success = cv2.imwrite(output_path, image, params)
+            if success:
+                return True
+        except Exception:
+            pass
+        
+        # imwrite 失败时可能留下 0 字节的空文件，回退前先删除
+        try:
+            if os.path.getsize(output_path) == 0:
+                os.remove(output_path)
+        except OSError:
+            pass
     
     # 使用 imencode + 文件写入来支持中文路径
     try:
-        # 根据文件扩展名确定编码格式
-        ext = Path(output_path).suffix.lower()
-        if not ext:
-            ext = '.png'
-        
         # 编码图片
-        success, encoded = cv2.imencode(ext, image)
+        success, encoded = cv2.imencode(ext, image, params)
         if not success:
             return False
         
         # 写入文件
-        with open(output_path, 'wb') as f:
-            f.write(encoded.tobytes())
+        _write_encoded(encoded, output_path)
         
         return True
     except Exception:
         return False
 
 
-def extract_last_frame(video_path: str, output_path: str | None = None) -> str:
+def _pyav_rotation(stream: "av.video.stream.VideoStream", frame: "av.VideoFrame") -> int:
     """
-    从视频中提取最后一帧并保存为图片
+    获取 PyAV 解码帧的旋转角度（顺时针，与 CAP_PROP_ORIENTATION_META 一致）
+    
+    NOTE: frame.rotation（PyAV 14.1+，requirements.txt 要求的最低版本）是显示矩阵的
+    逆时针角度，需要取反；只有搭配 FFmpeg 4.x 及更早版本时，流的 rotate 元数据中
+    才会给出顺时针角度，更新的 FFmpeg 已不再导出该元数据
     
     Args:
-        video_path: 视频文件路径（支持中文）
-        output_path: 输出图片路径（支持中文），如果未指定则自动生成
+        stream: 视频流
+        frame: 解码得到的帧
         
     Returns:
-        保存的图片路径
+        顺时针旋转角度，没有旋转信息时返回 0
+    """
+    rotation = getattr(frame, 'rotation', 0)
+    if rotation:
+        return -round(rotation) % 360
+    
+    try:
+        return int(stream.metadata.get('rotate', 0)) % 360
+    except ValueError:
+        return 0
+
+
+def _read_last_frame_pyav(video_path: str) -> "np.ndarray | None":
+    """
+    使用 PyAV 读取视频最后一帧
+    
+    NOTE: 先定位到结尾之前的最后一个关键帧，再从那里向后解码到结尾，
+    只需解码一个 GOP，而不是从第一帧开始解码整个视频。
+    含 B 帧的视频码流顺序与显示顺序不同，这里取 pts 最大（最后显示）的帧。
+    视频文件通过 mmap 交给 PyAV 读取，由操作系统负责预读，减少定位到结尾时的小块读取。
+    PyAV 不会自动旋转，这里按旋转元数据旋转一次，与 OpenCV 的输出方向保持一致
+    
+    Args:
+        video_path: 视频文件路径
+        
+    Returns:
+        最后一帧（BGR 格式），PyAV 不可用或读取失败时返回 None
+    """
+    if av is None:
+        return None
+    
+    try:
+        with open(video_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                av.open(mm) as container:
+            stream = container.streams.video[0]
+            
+            # 跳转到结尾之前的最后一个关键帧
+            if stream.duration is not None:
+                target = stream.duration
+                if stream.start_time is not None:
+                    target += stream.start_time
+                container.seek(target, any_frame=False, backward=True, stream=stream)
+            elif container.duration is not None:
+                container.seek(container.duration, any_frame=False, backward=True)
+            
+            # 从关键帧解码到结尾，保留显示顺序上的最后一帧
+            last = None
+            for frame in container.decode(stream):
+                if last is None or frame.pts is None or last.pts is None or frame.pts >= last.pts:
+                    last = frame
+            
+            if last is None:
+                return None
+            return _rotate_frame(
+                last.to_ndarray(format='bgr24'), _pyav_rotation(stream, last)
+            )
+    except Exception:
+        return None
+
+
+def _retrieve_frame_at(cap: cv2.VideoCapture, index: int) -> "np.ndarray | None":
+    """
+    定位到指定帧号并 retrieve 这一帧
+    
+    NOTE: OpenCV 的 FFmpeg 后端定位到第 N 帧后，最近一次 grab 的是第 N-1 帧，
+    需要再 grab 一次才能 retrieve 到第 N 帧；grab 后检查帧号，定位不准时返回 None
+    
+    Args:
+        cap: 已打开的 VideoCapture 对象
+        index: 帧号（从 0 开始）
+        
+    Returns:
+        指定的帧（BGR 格式），定位或读取失败时返回 None
+    """
+    cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+    if not cap.grab():
+        return None
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != index + 1:
+        return None
+    
+    ret, frame = cap.retrieve()
+    if not ret or frame is None:
+        return None
+    return frame
+
+
+def _grab_last_frame(
+    cap: cv2.VideoCapture,
+    seek: Callable[[cv2.VideoCapture], bool],
+) -> "np.ndarray | None":
+    """
+    从定位点开始只 grab 到结尾数出帧数，再直接定位到最后一帧 retrieve 一次
+    
+    NOTE: grab() 只解码不做颜色空间转换，转换发生在 retrieve() 中。
+    grab() 返回 False 之后无法再 retrieve 上一帧，所以记下定位点的帧号，
+    数完帧数后直接定位到最后一帧，而不是重新 grab 一遍整个区间
+    
+    Args:
+        cap: 已打开的 VideoCapture 对象
+        seek: 定位函数，返回是否定位成功
+        
+    Returns:
+        最后一帧（BGR 格式），失败时返回 None
+    """
+    if not seek(cap):
+        return None
+    
+    start = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    count = 0
+    while cap.grab():
+        count += 1
+    
+    if count == 0:
+        return None
+    return _retrieve_frame_at(cap, start + count - 1)
+
+
+def _retrieve_each_frame(cap: cv2.VideoCapture) -> "np.ndarray | None":
+    """
+    从当前位置逐帧 retrieve 到结尾，返回最后一帧
+    
+    NOTE: 用于定位后无法 retrieve 的后端。每帧都复用同一个缓冲区接收，
+    避免每帧都分配并释放一个 H×W×3 的数组
+    
+    Args:
+        cap: 已打开的 VideoCapture 对象
+        
+    Returns:
+        最后一帧（BGR 格式），一帧都读不到时返回 None
+    """
+    frame = None
+    while cap.grab():
+        try:
+            ret, current = cap.retrieve(frame)
+        except (cv2.error, TypeError):
+            # 旧版 OpenCV 的 retrieve 不支持传入输出缓冲区
+            ret, current = cap.retrieve()
+        if ret and current is not None:
+            frame = current
+    
+    return frame
+
+
+def _reopen_video(
+    cap: cv2.VideoCapture, video_path: str, hwaccel: bool = False
+) -> cv2.VideoCapture:
+    """
+    释放并重新打开视频，代替定位回第一帧
+    
+    NOTE: 很多后端定位到第 0 帧时会关闭重开容器并部分重建索引，结果也不确定，
+    直接重新打开同样从头开始，而且行为可靠
+    
+    Args:
+        cap: 需要释放的 VideoCapture 对象
+        video_path: 视频文件路径
+        hwaccel: 是否尝试硬件加速解码
+        
+    Returns:
+        新打开的 VideoCapture 对象
+    """
+    cap.release()
+    return open_video_chinese_path(video_path, hwaccel)
+
+
+def _read_last_frame_opencv(video_path: str, hwaccel: bool = False) -> "np.ndarray":
+    """
+    使用 OpenCV 读取视频最后一帧（PyAV 不可用或失败时的备用方案）
+    
+    Args:
+        video_path: 视频文件路径
+        hwaccel: 是否尝试硬件加速解码
+        
+    Returns:
+        最后一帧（BGR 格式）
         
     Raises:
-        FileNotFoundError: 视频文件不存在
         ValueError: 无法打开视频或视频为空
     """
-    # 检查视频文件是否存在
-    if not os.path.exists(video_path):
-        raise FileNotFoundError(f"视频文件不存在: {video_path}")
-    
     # 打开视频文件（支持中文路径）
-    cap = open_video_chinese_path(video_path)
+    cap = open_video_chinese_path(video_path, hwaccel)
     
     if not cap.isOpened():
         raise ValueError(f"无法打开视频文件: {video_path}")
@@ -145,68 +534,326 @@ def extract_last_frame(video_path: str, output_path: str | None = None) -> str:
         if total_frames <= 0:
             raise ValueError("视频帧数为 0，可能是空视频或格式不支持")
         
-        # 跳转到最后一帧
-        # NOTE: 有些视频格式可能不支持精确跳转，所以我们跳转到倒数第二帧再读取
-        cap.set(cv2.CAP_PROP_POS_FRAMES, total_frames - 1)
+        # 直接定位到最后一帧，大多数视频这样就能读到
+        frame = _retrieve_frame_at(cap, total_frames - 1)
         
-        # 读取最后一帧
-        ret, frame = cap.read()
+        # 帧号定位失败时，按时间定位到结尾前 2 秒，走 FFmpeg 的关键帧索引
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if frame is None and fps > 0:
+            duration_ms = total_frames / fps * 1000
+            start_ms = max(0.0, duration_ms - 2000)
+            frame = _grab_last_frame(
+                cap, lambda c: c.set(cv2.CAP_PROP_POS_MSEC, start_ms)
+            )
         
-        if not ret or frame is None:
-            # 如果直接跳转失败，尝试逐帧读取到最后
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            last_frame = None
-            while True:
-                ret, current_frame = cap.read()
-                if not ret:
+        # 按时间定位失败时，从倒数第一帧开始按指数退避向前试探定位点
+        if frame is None:
+            for offset in SEEK_BACKOFF_OFFSETS:
+                target = total_frames - offset
+                if target < 0:
+                    break
+                frame = _grab_last_frame(
+                    cap, lambda c, t=target: c.set(cv2.CAP_PROP_POS_FRAMES, t)
+                )
+                if frame is not None:
                     break
-                last_frame = current_frame
+        
+        if frame is None:
+            # 如果所有定位点都失败，从头逐帧 grab 到最后（不做像素格式转换）
+            cap = _reopen_video(cap, video_path, hwaccel)
+            count = 0
+            while cap.grab():
+                count += 1
+            
+            if count == 0:
+                raise ValueError("无法读取视频帧")
+            
+            # 定位到实际的最后一帧，只对这一帧做 retrieve
+            frame = _retrieve_frame_at(cap, count - 1)
             
-            if last_frame is None:
+            # 后端不支持定位后 retrieve 时，只能从头逐帧 retrieve
+            if frame is None:
+                cap = _reopen_video(cap, video_path, hwaccel)
+                frame = _retrieve_each_frame(cap)
+            
+            if frame is None:
                 raise ValueError("无法读取视频帧")
-            frame = last_frame
         
-        # 生成输出路径
-        if output_path is None:
-            video_name = Path(video_path).stem
-            video_dir = Path(video_path).parent
-            output_path = str(video_dir / f"{video_name}_last_frame.png")
+        return _apply_orientation(cap, frame)
         
-        # 保存图片（支持中文路径）
-        success = save_image_chinese_path(frame, output_path)
+    finally:
+        cap.release()
+
+
+def _default_output_path(video_file: Path, image_format: str) -> str:
+    """
+    生成默认输出路径：与视频同目录的 `<视频文件名>_last_frame.<格式>`
+    
+    Args:
+        video_file: 视频文件路径
+        image_format: 图片格式（jpg/png/webp）
         
-        if not success:
-            raise ValueError(f"无法保存图片到: {output_path}")
+    Returns:
+        输出图片路径
+    """
+    return str(video_file.parent / f"{video_file.stem}_last_frame.{image_format}")
+
+
+def extract_last_frame(
+    video_path: str,
+    output_path: str | None = None,
+    image_format: str = 'jpg',
+    hwaccel: bool = False,
+) -> str:
+    """
+    从视频中提取最后一帧并保存为图片
+    
+    Args:
+        video_path: 视频文件路径（支持中文）
+        output_path: 输出图片路径（支持中文），如果未指定则自动生成
+        image_format: 自动生成输出路径时使用的图片格式（jpg/png/webp）
+        hwaccel: OpenCV 解码时是否尝试硬件加速
         
-        return output_path
+    Returns:
+        保存的图片路径
         
-    finally:
-        cap.release()
+    Raises:
+        FileNotFoundError: 视频文件不存在
+        ValueError: 无法打开视频或视频为空
+    """
+    # 检查视频文件是否存在（只构造一次 Path，后续复用）
+    video_file = Path(video_path)
+    if not video_file.is_file():
+        raise FileNotFoundError(f"视频文件不存在: {video_path}")
+    
+    # 优先使用 PyAV 关键帧定位，失败时回退到 OpenCV
+    frame = _read_last_frame_pyav(video_path)
+    if frame is None:
+        frame = _read_last_frame_opencv(video_path, hwaccel)
+    
+    # 生成输出路径
+    if output_path is None:
+        output_path = _default_output_path(video_file, image_format)
+    
+    # 保存图片（支持中文路径）
+    success = save_image_chinese_path(frame, output_path)
+    
+    if not success:
+        raise ValueError(f"无法保存图片到: {output_path}")
+    
+    return output_path
+
+
+def _expand_video_paths(patterns: list[str]) -> list[str]:
+    """
+    展开命令行传入的视频路径，支持通配符
+    
+    Args:
+        patterns: 视频文件路径或通配符列表
+        
+    Returns:
+        视频文件路径列表（保持输入顺序并去除重复的文件），
+        没有匹配的通配符原样保留以便报告错误
+    """
+    video_paths = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.exists(pattern):
+            matches = [pattern]
+        else:
+            matches = sorted(glob.glob(pattern)) or [pattern]
+        
+        for video_path in matches:
+            key = os.path.normcase(os.path.abspath(video_path))
+            if key not in seen:
+                seen.add(key)
+                video_paths.append(video_path)
+    return video_paths
+
+
+def _find_output_conflicts(video_paths: list[str], image_format: str) -> list[list[str]]:
+    """
+    找出自动生成的输出路径相同的视频（例如同目录下的 a.mp4 和 a.mkv）
+    
+    NOTE: 批量处理时这些视频会在不同线程中同时写入同一个文件，结果可能是两份编码数据混在一起
+    
+    Args:
+        video_paths: 视频文件路径列表
+        image_format: 图片格式
+        
+    Returns:
+        输出路径冲突的视频分组，没有冲突时为空列表
+    """
+    groups = {}
+    for video_path in video_paths:
+        output_path = _default_output_path(Path(video_path), image_format)
+        key = os.path.normcase(os.path.abspath(output_path))
+        groups.setdefault(key, []).append(video_path)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def _process_video(
+    video_path: str,
+    output_path: str | None,
+    image_format: str,
+    hwaccel: bool,
+) -> tuple[str | None, str | None]:
+    """
+    提取单个视频的最后一帧，并把异常转换为错误信息
+    
+    Args:
+        video_path: 视频文件路径
+        output_path: 输出图片路径，None 表示自动生成
+        image_format: 自动生成输出路径时使用的图片格式
+        hwaccel: OpenCV 解码时是否尝试硬件加速
+        
+    Returns:
+        (保存的图片路径, 错误信息)，成功时错误信息为 None
+    """
+    try:
+        return extract_last_frame(video_path, output_path, image_format, hwaccel), None
+    except (FileNotFoundError, ValueError) as e:
+        return None, f"错误: {e}"
+    except Exception as e:
+        return None, f"未知错误: {e}"
+
+
+def _serve(image_format: str, hwaccel: bool) -> None:
+    """
+    常驻模式：从标准输入逐行读取视频路径并逐行输出结果
+    
+    NOTE: 整个会话只导入一次 OpenCV/PyAV，适合由其他程序驱动处理大量视频。
+    成功时输出图片路径，失败时输出 `ERR<TAB>错误信息`，每行处理完立即刷新
+    
+    Args:
+        image_format: 输出图片格式
+        hwaccel: OpenCV 解码时是否尝试硬件加速
+    """
+    for line in sys.stdin:
+        video_path = line.rstrip('\r\n')
+        if not video_path:
+            continue
+        
+        saved_path, error = _process_video(video_path, None, image_format, hwaccel)
+        if error is None:
+            sys.stdout.write(f"{saved_path}\n")
+        else:
+            sys.stdout.write(f"ERR\t{error}\n")
+        sys.stdout.flush()
 
 
 def main():
     """命令行入口"""
-    if len(sys.argv) < 2:
-        print("使用方法: python extract_last_frame.py <视频文件路径> [输出图片路径]")
-        print("示例:")
-        print("  python extract_last_frame.py video.mp4")
-        print("  python extract_last_frame.py video.mp4 output.png")
-        sys.exit(1)
+    # 统一使用 UTF-8 输出，避免 Windows 非 UTF-8 控制台输出 emoji/中文时编码出错
+    try:
+        sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    except AttributeError:
+        pass
     
-    video_path = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(
+        description="从视频文件中提取最后一帧并保存为图片",
+        epilog=(
+            "示例:\n"
+            "  python extract_last_frame.py video.mp4\n"
+            "  python extract_last_frame.py video.mp4 output.png\n"
+            "  python extract_last_frame.py video.mp4 --format png\n"
+            "  python extract_last_frame.py a.mp4 b.mkv \"videos/*.mp4\"\n"
+            "  find . -name '*.mp4' | python extract_last_frame.py --serve"
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        metavar="path",
+        help=(
+            "视频文件路径，可以传入多个文件或通配符批量处理；"
+            "只有一个视频时，第二个参数若是图片路径则作为输出路径"
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        choices=("jpg", "png", "webp"),
+        default="jpg",
+        help="未指定输出路径时使用的图片格式（默认 jpg）",
+    )
+    parser.add_argument(
+        "--hwaccel",
+        action="store_true",
+        help="OpenCV 解码时尝试硬件加速（驱动不可用时自动回退到软件解码）",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="常驻模式：从标准输入逐行读取视频路径，每行输出图片路径或 ERR<TAB>错误信息",
+    )
+    args = parser.parse_args()
     
-    try:
-        saved_path = extract_last_frame(video_path, output_path)
+    if args.serve:
+        if args.paths:
+            parser.error("--serve 模式从标准输入读取视频路径，不能同时传入路径参数")
+        _serve(args.format, args.hwaccel)
+        return
+    
+    if not args.paths:
+        parser.error("请提供至少一个视频文件路径")
+    
+    # 兼容 `<视频文件路径> [输出图片路径]` 的用法：
+    # 第二个参数是图片扩展名，或者既不是已存在的文件也匹配不到任何文件时，视为输出路径
+    output_path = None
+    patterns = args.paths
+    if len(patterns) == 2:
+        second = patterns[1]
+        if (
+            Path(second).suffix.lower() in IMAGE_EXTENSIONS
+            or not (os.path.exists(second) or glob.glob(second))
+        ):
+            patterns, output_path = patterns[:1], second
+    
+    video_paths = _expand_video_paths(patterns)
+    
+    if output_path is not None and len(video_paths) > 1:
+        parser.error(
+            f"指定了输出路径 {output_path}，但匹配到 {len(video_paths)} 个视频；"
+            "批量处理时不能指定输出路径"
+        )
+    
+    # 单个视频：直接处理
+    if len(video_paths) == 1:
+        saved_path, error = _process_video(
+            video_paths[0], output_path, args.format, args.hwaccel
+        )
+        if error is not None:
+            print(f"❌ {error}")
+            sys.exit(1)
         print(f"✅ 最后一帧已成功保存到: {saved_path}")
-    except FileNotFoundError as e:
-        print(f"❌ 错误: {e}")
-        sys.exit(1)
-    except ValueError as e:
-        print(f"❌ 错误: {e}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"❌ 未知错误: {e}")
+        return
+    
+    # 自动生成的输出路径不能重复，否则多个线程会同时写同一个文件
+    conflicts = _find_output_conflicts(video_paths, args.format)
+    if conflicts:
+        parser.error(
+            "以下视频会生成相同的输出文件名，请分别处理: "
+            + "；".join("、".join(group) for group in conflicts)
+        )
+    
+    # 多个视频：在同一个进程内用线程池并行处理，按输入顺序输出结果
+    max_workers = min(MAX_BATCH_WORKERS, os.cpu_count() or 1, len(video_paths))
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda path: _process_video(path, None, args.format, args.hwaccel),
+            video_paths,
+        )
+        for video_path, (saved_path, error) in zip(video_paths, results):
+            if error is not None:
+                failed += 1
+                print(f"❌ {video_path}: {error}")
+            else:
+                print(f"✅ 最后一帧已成功保存到: {saved_path}")
+    
+    print(f"完成: {len(video_paths) - failed} 个成功，{failed} 个失败")
+    if failed:
         sys.exit(1)
 
 
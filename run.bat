@@ -16,6 +16,7 @@ if "%~1"=="" (
     echo 示例:
     echo     run.bat video.mp4
     echo     run.bat video.mp4 output.png
+    echo     run.bat a.mp4 b.mp4 "videos\*.mp4"
     pause
     exit /b 1
 )